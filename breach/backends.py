@@ -0,0 +1,105 @@
+# breach/backends.py
+
+import os
+from typing import Dict, Any, List
+
+import requests
+from dotenv import load_dotenv
+
+from .index import BreachIndex
+from .results import BreachEntry, BreachLookupError, BreachReport
+
+load_dotenv()
+
+
+class BreachBackend:
+    """
+    Source of breach data for /check_email/. Implementations return a
+    BreachReport so the views in breach/results.py work for any backend.
+    """
+
+    name = "base"
+
+    def lookup(self, email: str) -> BreachReport:
+        raise NotImplementedError
+
+    def prefix_range(self, hex_prefix: str, limit: int = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError(f"{self.name} backend does not support hash-prefix queries")
+
+
+class RapidAPIBackend(BreachBackend):
+    """
+    BreachDirectory on RapidAPI. Sends the email to the third party.
+    """
+
+    name = "rapidapi"
+    url = "https://breachdirectory.p.rapidapi.com/"
+
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key or os.getenv("RAPIDAPI_KEY")
+        if not self.api_key:
+            raise RuntimeError("RAPIDAPI_KEY is missing from .env")
+
+    def lookup(self, email: str) -> BreachReport:
+        querystring = {"func": "auto", "term": email}
+        headers = {
+            "x-rapidapi-key": self.api_key,
+            "x-rapidapi-host": "breachdirectory.p.rapidapi.com"
+        }
+        try:
+            response = requests.get(self.url, headers=headers, params=querystring, timeout=15)
+            response.raise_for_status()
+            payload = response.json()
+        except requests.RequestException as e:
+            raise BreachLookupError(f"Breach lookup failed: {e}")
+        except ValueError:
+            raise BreachLookupError("Breach lookup failed: upstream did not return JSON")
+        return BreachReport.from_response(payload)
+
+
+class LocalIndexBackend(BreachBackend):
+    """
+    Offline lookups against an index built by breach.build_index. The email
+    is only hashed locally; no network I/O.
+    """
+
+    name = "local"
+
+    def __init__(self, path: str = None):
+        path = path or os.getenv("BREACH_INDEX_PATH")
+        if not path:
+            raise RuntimeError("BREACH_INDEX_PATH is missing from .env")
+        self.index = BreachIndex(path)
+
+    @staticmethod
+    def _entry(record: Dict[str, Any]) -> BreachEntry:
+        return BreachEntry(
+            email=True,
+            has_password=record["has_password"],
+            password="",
+            sha1="",
+            hash="",
+            sources=(record["source"],),
+            last_breach=record["last_breach"],
+            has_hash=record["has_hash"],
+        )
+
+    def lookup(self, email: str) -> BreachReport:
+        entries = [self._entry(r) for r in self.index.lookup(email)]
+        return BreachReport(found=len(entries), entries=entries)
+
+    def prefix_range(self, hex_prefix: str, limit: int = None) -> List[Dict[str, Any]]:
+        return self.index.prefix_range(hex_prefix, limit)
+
+
+BACKENDS = {
+    RapidAPIBackend.name: RapidAPIBackend,
+    LocalIndexBackend.name: LocalIndexBackend,
+}
+
+
+def get_backend(name: str = None) -> BreachBackend:
+    name = (name or os.getenv("BREACH_BACKEND", RapidAPIBackend.name)).lower()
+    if name not in BACKENDS:
+        raise RuntimeError(f"Unknown BREACH_BACKEND '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
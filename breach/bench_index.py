@@ -0,0 +1,98 @@
+# breach/bench_index.py
+#
+# Build-throughput and lookup-latency benchmark for the breach index on a
+# synthetic corpus.
+#
+#   python -m breach.bench_index --records 1000000
+#   python -m breach.bench_index --records 100000000 --workdir /data/bench
+#
+# The 100M run needs roughly 5 GB of free disk for the dumps, sort chunks and
+# the ~2.2 GB index.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from typing import List
+
+from .build_index import DEFAULT_CHUNK_RECORDS, build_index
+from .index import BreachIndex, hash_identifier
+
+
+def _identifier(i: int) -> str:
+    return f"user{i}@example{i % 97}.com"
+
+
+def write_dumps(workdir: str, records: int, sources: int) -> List[tuple]:
+    dumps = []
+    per_source = -(-records // sources)
+    for s in range(sources):
+        path = os.path.join(workdir, f"source{s}.txt")
+        start, stop = s * per_source, min((s + 1) * per_source, records)
+        with open(path, "w", buffering=1024 * 1024) as f:
+            for i in range(start, stop):
+                f.write(f"{_identifier(i)}:pw{i}\n" if i % 3 == 0 else _identifier(i) + "\n")
+        dumps.append((path, f"Source{s}", f"{2010 + s % 15}-{s % 12 + 1:02d}"))
+    return dumps
+
+
+def _percentiles(samples: List[float]) -> dict:
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6, 2)
+    return {"p50_us": pick(0.50), "p90_us": pick(0.90), "p99_us": pick(0.99), "max_us": pick(1.0)}
+
+
+def bench_lookups(index: BreachIndex, records: int, lookups: int, prefix_len: int) -> dict:
+    rng = random.Random(0)
+    hits = [_identifier(rng.randrange(records)) for _ in range(lookups)]
+    misses = [f"nobody{i}@example.org" for i in range(lookups)]
+    prefixes = [hash_identifier(e).hex()[:prefix_len] for e in hits[:max(1, lookups // 10)]]
+
+    results = {}
+    for label, fn, args in (
+        ("hit", index.lookup, hits),
+        ("miss", index.lookup, misses),
+        (f"prefix{prefix_len}", index.prefix_range, prefixes),
+    ):
+        samples, found = [], 0
+        for arg in args:
+            t = time.perf_counter()
+            found += bool(fn(arg))
+            samples.append(time.perf_counter() - t)
+        results[label] = {"queries": len(args), "found": found, **_percentiles(samples)}
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark breach index build and lookup.")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--sources", type=int, default=50)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--prefix-len", type=int, default=5, help="hex digits for k-anonymity queries")
+    parser.add_argument("--chunk-records", type=int, default=DEFAULT_CHUNK_RECORDS)
+    parser.add_argument("--workdir", help="where to put dumps and the index (default: a temp dir)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as work:
+        t = time.perf_counter()
+        dumps = write_dumps(work, args.records, args.sources)
+        generated = round(time.perf_counter() - t, 2)
+
+        out = os.path.join(work, "bench.idx")
+        build = build_index(out, dumps, chunk_records=args.chunk_records, tmpdir=work)
+        for path, _, _ in dumps:
+            os.remove(path)
+
+        with BreachIndex(out) as index:
+            lookup = bench_lookups(index, args.records, args.lookups, args.prefix_len)
+
+    print(json.dumps({"records": args.records, "generate_seconds": generated,
+                      "build": build, "lookup": lookup}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
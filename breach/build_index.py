@@ -0,0 +1,179 @@
+# breach/build_index.py
+#
+# Offline builder for breach/index.py files.
+#
+#   python -m breach.build_index breaches.idx dumps/canva.txt=Canva:2019-05 dumps/adobe.txt
+#
+# Each dump is a text file with one identifier per line, optionally followed
+# by ":", ";" or "," and the leaked value (password or hash). The source name
+# defaults to the file name and the breach month ("YYYY-MM") is optional.
+# Records are sorted in bounded chunks on disk and k-way merged, so memory use
+# depends on --chunk-records, not on the size of the corpus.
+
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+from .index import (
+    HEADER, MAGIC, VERSION, RECORD, RECORD_SIZE, HASH_SIZE, PREFIX_SLOTS,
+    TABLE_OFFSET, FLAG_PASSWORD, FLAG_HASH, encode_month, hash_identifier,
+)
+
+DEFAULT_CHUNK_RECORDS = 5_000_000
+_SEPARATORS = (":", ";", ",")
+_HEX_DIGITS = set("0123456789abcdefABCDEF")
+
+
+def parse_dump_spec(spec: str) -> Tuple[str, str, str]:
+    """
+    "path[=Source[:YYYY-MM]]" -> (path, source, month)
+    """
+    path, _, rest = spec.partition("=")
+    source, _, month = rest.partition(":")
+    return path, source or Path(path).stem, month
+
+
+def _line_flags(value: str) -> int:
+    if not value:
+        return 0
+    if len(value) in (32, 40, 64) and set(value) <= _HEX_DIGITS:
+        return FLAG_HASH
+    return FLAG_PASSWORD
+
+
+def iter_dump_records(path: str, source_id: int, month: int) -> Iterator[bytes]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            cut = min((i for i in (line.find(s) for s in _SEPARATORS) if i > 0), default=-1)
+            if cut > 0:
+                identifier, value = line[:cut], line[cut + 1:].strip()
+            else:
+                identifier, value = line, ""
+            yield RECORD.pack(hash_identifier(identifier), source_id, _line_flags(value), 0, month)
+
+
+def _write_chunk(records: List[bytes], tmpdir: str, n: int) -> str:
+    records.sort()
+    path = os.path.join(tmpdir, f"chunk-{n:05d}.bin")
+    with open(path, "wb") as f:
+        f.write(b"".join(records))
+    return path
+
+
+def _read_chunk(path: str) -> Iterator[bytes]:
+    with open(path, "rb", buffering=1024 * 1024) as f:
+        while True:
+            block = f.read(RECORD_SIZE * 4096)
+            if not block:
+                return
+            for off in range(0, len(block), RECORD_SIZE):
+                yield block[off:off + RECORD_SIZE]
+
+
+def _dedupe(records: Iterable[bytes]) -> Iterator[bytes]:
+    # Same identifier listed more than once for a source: keep one record,
+    # with the union of the exposed field flags.
+    prev = None
+    for rec in records:
+        if prev is not None and rec[:HASH_SIZE + 2] == prev[:HASH_SIZE + 2]:
+            digest, source_id, flags, reserved, month = RECORD.unpack(prev)
+            prev = RECORD.pack(digest, source_id, flags | rec[HASH_SIZE + 2], reserved, max(month, RECORD.unpack(rec)[4]))
+            continue
+        if prev is not None:
+            yield prev
+        prev = rec
+    if prev is not None:
+        yield prev
+
+
+def build_index(out_path: str, dumps: Iterable[Tuple[str, str, str]],
+                chunk_records: int = DEFAULT_CHUNK_RECORDS, tmpdir: str = None) -> dict:
+    """
+    Builds an index from (path, source, "YYYY-MM") dumps and returns build stats.
+    """
+    started = time.perf_counter()
+    sources: List[str] = []
+    read = 0
+
+    with tempfile.TemporaryDirectory(dir=tmpdir) as work:
+        chunks, buf = [], []
+        for path, source, month in dumps:
+            if source not in sources:
+                sources.append(source)
+            for rec in iter_dump_records(path, sources.index(source), encode_month(month)):
+                buf.append(rec)
+                if len(buf) >= chunk_records:
+                    chunks.append(_write_chunk(buf, work, len(chunks)))
+                    read += len(buf)
+                    buf = []
+        if buf:
+            chunks.append(_write_chunk(buf, work, len(chunks)))
+            read += len(buf)
+        del buf
+        sorted_at = time.perf_counter()
+
+        table = [0] * (PREFIX_SLOTS + 1)
+        count = 0
+        with open(out_path, "wb") as out:
+            out.write(b"\x00" * (TABLE_OFFSET + len(table) * 8))
+            batch = []
+            for rec in _dedupe(heapq.merge(*(_read_chunk(c) for c in chunks))):
+                table[(rec[0] << 8 | rec[1]) + 1] += 1
+                batch.append(rec)
+                count += 1
+                if len(batch) >= 65536:
+                    out.write(b"".join(batch))
+                    batch = []
+            out.write(b"".join(batch))
+
+            sources_blob = json.dumps(sources).encode("utf-8")
+            sources_offset = out.tell()
+            out.write(sources_blob)
+
+            # Per-prefix counts -> cumulative start index of each prefix.
+            for p in range(1, len(table)):
+                table[p] += table[p - 1]
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, count, sources_offset, len(sources_blob)))
+            out.write(b"".join(p.to_bytes(8, "big") for p in table))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "records_read": read,
+        "records_written": count,
+        "sources": len(sources),
+        "chunks": len(chunks),
+        "sort_seconds": round(sorted_at - started, 2),
+        "merge_seconds": round(elapsed - (sorted_at - started), 2),
+        "seconds": round(elapsed, 2),
+        "records_per_second": round(read / elapsed) if elapsed else read,
+        "bytes": os.path.getsize(out_path),
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build a memory-mappable breach index from raw dumps.")
+    parser.add_argument("output", help="index file to write")
+    parser.add_argument("dumps", nargs="+", help="path[=Source[:YYYY-MM]]")
+    parser.add_argument("--chunk-records", type=int, default=DEFAULT_CHUNK_RECORDS,
+                        help="records sorted in memory per temporary chunk")
+    parser.add_argument("--tmpdir", help="directory for temporary chunk files")
+    args = parser.parse_args(argv)
+
+    stats = build_index(args.output, [parse_dump_spec(d) for d in args.dumps],
+                        chunk_records=args.chunk_records, tmpdir=args.tmpdir)
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
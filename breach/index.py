@@ -0,0 +1,164 @@
+# breach/index.py
+#
+# On-disk breach index: a sorted array of fixed-width records keyed by a
+# truncated SHA-256 of the normalised identifier, read through mmap.
+#
+# Layout (all integers big-endian):
+#   header        MAGIC, version, record size, record count,
+#                 offset and length of the source-name table
+#   prefix table  PREFIX_SLOTS + 1 uint64 record indexes; slot p holds the
+#                 first record whose hash starts with the 2-byte prefix p
+#   records       RECORD_SIZE bytes each, sorted by (hash, source id)
+#   sources       JSON list of source names, indexed by source id
+
+import json
+import mmap
+import struct
+import hashlib
+from typing import Dict, Any, List, Optional
+
+MAGIC = b"BRIDX\x00\x00\x01"
+VERSION = 1
+HASH_SIZE = 16
+PREFIX_SLOTS = 1 << 16
+
+HEADER = struct.Struct(">8sIIQQQ")
+RECORD = struct.Struct(">16sHBBH")  # hash, source id, flags, reserved, month
+RECORD_SIZE = RECORD.size
+TABLE_OFFSET = HEADER.size
+RECORDS_OFFSET = TABLE_OFFSET + (PREFIX_SLOTS + 1) * 8
+
+FLAG_PASSWORD = 0x01
+FLAG_HASH = 0x02
+
+
+def normalize_identifier(identifier: str) -> str:
+    return identifier.strip().lower()
+
+
+def hash_identifier(identifier: str) -> bytes:
+    return hashlib.sha256(normalize_identifier(identifier).encode("utf-8")).digest()[:HASH_SIZE]
+
+
+def encode_month(value: Optional[str]) -> int:
+    """
+    "YYYY-MM" -> months since year 0 (0 means unknown).
+    """
+    if not value:
+        return 0
+    year, _, month = value.partition("-")
+    return int(year) * 12 + (int(month) if month else 1)
+
+
+def decode_month(value: int) -> Optional[str]:
+    if not value:
+        return None
+    year, month = divmod(value - 1, 12)
+    return f"{year:04d}-{month + 1:02d}"
+
+
+class BreachIndex:
+    """
+    Read-only view of an index file. Lookups are a binary search within the
+    slice of records sharing the hash's 2-byte prefix; nothing is loaded into
+    memory beyond the pages the search touches.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, record_size, count, sources_offset, sources_length = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            raise ValueError(f"{path} is not a breach index (or was built by another version)")
+        self.count = count
+        self.sources: List[str] = json.loads(self._mm[sources_offset:sources_offset + sources_length])
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _slot(self, prefix: int) -> int:
+        return struct.unpack_from(">Q", self._mm, TABLE_OFFSET + prefix * 8)[0]
+
+    def _key(self, i: int) -> bytes:
+        off = RECORDS_OFFSET + i * RECORD_SIZE
+        return self._mm[off:off + HASH_SIZE]
+
+    def _lower_bound(self, key: bytes, lo: int, hi: int) -> int:
+        n = len(key)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[:n] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _upper_bound(self, key: bytes, lo: int, hi: int) -> int:
+        n = len(key)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[:n] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _record(self, i: int) -> Dict[str, Any]:
+        digest, source_id, flags, _, month = RECORD.unpack_from(self._mm, RECORDS_OFFSET + i * RECORD_SIZE)
+        return {
+            "hash": digest.hex(),
+            "source": self.sources[source_id],
+            "has_password": bool(flags & FLAG_PASSWORD),
+            "has_hash": bool(flags & FLAG_HASH),
+            "last_breach": decode_month(month),
+        }
+
+    def _range(self, low: bytes, high: bytes) -> range:
+        """
+        Records whose hash, truncated to len(low), lies in [low, high].
+        """
+        if len(low) >= 2:
+            lo, hi = self._slot(int.from_bytes(low[:2], "big")), self._slot(int.from_bytes(high[:2], "big") + 1)
+        elif low:
+            lo, hi = self._slot(low[0] << 8), self._slot((high[0] + 1) << 8)
+        else:
+            lo, hi = 0, self.count
+        lo = self._lower_bound(low, lo, hi)
+        return range(lo, self._upper_bound(high, lo, hi))
+
+    def lookup_hash(self, digest: bytes) -> List[Dict[str, Any]]:
+        digest = digest[:HASH_SIZE]
+        return [self._record(i) for i in self._range(digest, digest)]
+
+    def lookup(self, identifier: str) -> List[Dict[str, Any]]:
+        return self.lookup_hash(hash_identifier(identifier))
+
+    def prefix_range(self, hex_prefix: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        All records whose hash starts with `hex_prefix`, for k-anonymity style
+        queries where the caller only reveals the first few hex digits of the
+        SHA-256 of the identifier. Odd-length prefixes are supported; digits
+        beyond the HASH_SIZE bytes stored per record are ignored.
+        """
+        hex_prefix = hex_prefix.lower()[:HASH_SIZE * 2]
+        if len(hex_prefix) % 2:
+            low, high = bytes.fromhex(hex_prefix + "0"), bytes.fromhex(hex_prefix + "f")
+        else:
+            low = high = bytes.fromhex(hex_prefix)
+
+        rows = self._range(low, high)
+        if limit is not None:
+            rows = rows[:limit]
+        return [self._record(i) for i in rows]
@@ -0,0 +1,148 @@
+# breach/results.py
+
+import json
+from dataclasses import dataclass
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+class BreachLookupError(RuntimeError):
+    """
+    The breach source failed or answered with something that is not a
+    result. Never reported to users as "0 breaches".
+    """
+
+
+ENTRY_FIELDS = ("email", "hash_password", "password", "sha1", "hash", "sources", "last_breach")
+
+
+def _split_sources(value: Any) -> Tuple[str, ...]:
+    if isinstance(value, (list, tuple)):
+        names = [str(v).strip() for v in value]
+    else:
+        names = str(value or "").split(",")
+    names = tuple(n.strip() for n in names if n and n.strip())
+    return names or ("Unknown",)
+
+
+@dataclass(frozen=True)
+class BreachEntry:
+    email: Any
+    has_password: bool
+    password: str
+    sha1: str
+    hash: str
+    sources: Tuple[str, ...]
+    last_breach: Optional[str] = None
+    # Backends that only know *that* a password hash leaked (not its value)
+    # set this instead of `hash`.
+    has_hash: bool = False
+
+    @classmethod
+    def from_raw(cls, raw: Dict[str, Any]) -> "BreachEntry":
+        return cls(
+            email=raw.get("email", raw.get("email_only")),
+            has_password=bool(raw.get("hash_password") or raw.get("has_password")),
+            password=raw.get("password") or "",
+            sha1=raw.get("sha1") or "",
+            hash=raw.get("hash") or "",
+            sources=_split_sources(raw.get("sources")),
+            last_breach=raw.get("last_breach") or raw.get("date") or None,
+        )
+
+    @property
+    def field_types(self) -> Tuple[str, ...]:
+        types = ["email"]
+        if self.has_password or self.password:
+            types.append("password")
+        if self.sha1:
+            types.append("sha1")
+        if self.hash or self.has_hash:
+            types.append("hash")
+        return tuple(types)
+
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        # Same shape as the upstream entry, so existing clients keep working.
+        full = {
+            "email": self.email,
+            "hash_password": self.has_password,
+            "password": self.password,
+            "sha1": self.sha1,
+            "hash": self.hash,
+            "sources": ", ".join(self.sources),
+        }
+        if self.last_breach:
+            full["last_breach"] = self.last_breach
+        if fields is None:
+            return full
+        return {k: v for k, v in full.items() if k in fields}
+
+
+@dataclass
+class BreachReport:
+    found: int
+    entries: List[BreachEntry]
+
+    @classmethod
+    def from_response(cls, payload: Dict[str, Any]) -> "BreachReport":
+        if not isinstance(payload, dict) or "found" not in payload or payload.get("success") is False:
+            message = (payload.get("message") or payload.get("error")) if isinstance(payload, dict) else None
+            raise BreachLookupError(f"Breach lookup failed: {message or 'unexpected response'}")
+        raw_entries = payload.get("result") or []
+        if not isinstance(raw_entries, list):
+            raise BreachLookupError("Breach lookup failed: malformed result list")
+        entries = [BreachEntry.from_raw(r) for r in raw_entries if isinstance(r, dict)]
+        return cls(found=int(payload.get("found") or len(entries)), entries=entries)
+
+    @property
+    def message(self) -> str:
+        return f"Your email was found in {self.found} breaches."
+
+    def summarize(self) -> List[Dict[str, Any]]:
+        """
+        One row per breach source with the number of entries, the earliest and
+        latest breach dates seen, and which field types were exposed.
+        """
+        by_source: Dict[str, Dict[str, Any]] = {}
+        for entry in self.entries:
+            for source in entry.sources:
+                row = by_source.get(source)
+                if row is None:
+                    row = by_source[source] = {
+                        "source": source, "count": 0, "earliest": None, "latest": None,
+                        "has_password": False, "fields": set(),
+                    }
+                row["count"] += 1
+                row["has_password"] = row["has_password"] or entry.has_password
+                row["fields"].update(entry.field_types)
+                if entry.last_breach:
+                    if row["earliest"] is None or entry.last_breach < row["earliest"]:
+                        row["earliest"] = entry.last_breach
+                    if row["latest"] is None or entry.last_breach > row["latest"]:
+                        row["latest"] = entry.last_breach
+
+        rows = sorted(by_source.values(), key=lambda r: (-r["count"], r["source"].lower()))
+        for row in rows:
+            row["fields"] = sorted(row["fields"])
+        return rows
+
+
+def paginate(items: List[Any], page: int, page_size: Optional[int]) -> List[Any]:
+    if not page_size:
+        return items
+    start = (page - 1) * page_size
+    return items[start:start + page_size]
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    names = tuple(f.strip() for f in (fields or "").split(",") if f.strip())
+    if not names:
+        return None
+    unknown = [n for n in names if n not in ENTRY_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}, expected any of {list(ENTRY_FIELDS)}")
+    return names
+
+
+def iter_ndjson(header: Dict[str, Any], rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    yield json.dumps(header) + "\n"
+    for row in rows:
+        yield json.dumps(row) + "\n"
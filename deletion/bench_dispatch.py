@@ -0,0 +1,143 @@
+# deletion/bench_dispatch.py
+#
+# Throughput benchmark for deletion-letter dispatch against a local SMTP
+# stand-in that adds a fixed delay to every reply to mimic a remote server.
+#
+#   python -m deletion.bench_dispatch --letters 500 --domains 15 --latency-ms 20
+#
+# "sequential" opens a fresh connection per letter, one after another.
+# "dispatcher" runs the queued, pooled Dispatcher.
+
+import os
+import sys
+import json
+import time
+import argparse
+import smtplib
+import tempfile
+import threading
+import socketserver
+from typing import List
+
+from .dispatch import Dispatcher, DomainThrottle, SMTPPool
+from .letters import Letter
+from .queue import DispatchQueue
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    def _reply(self, text: str) -> None:
+        time.sleep(self.server.latency)
+        self.wfile.write(text.encode("ascii") + b"\r\n")
+
+    def handle(self) -> None:
+        self._reply("220 localhost bench ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line[:4].upper()
+            if verb == b"EHLO":
+                self._reply("250-localhost\r\n250 8BITMIME")
+            elif verb == b"DATA":
+                self._reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.received += 1
+                self._reply("250 OK queued")
+            elif verb == b"QUIT":
+                self._reply("221 bye")
+                return
+            elif verb in (b"HELO", b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                self._reply("250 OK")
+            else:
+                self._reply("502 not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), _SinkHandler)
+        self.latency = latency
+        self.received = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+def make_letters(count: int, domains: int) -> List[Letter]:
+    body = "Dear Data Protection Officer,\n\n" + "Please erase my personal data.\n" * 30
+    return [
+        Letter(platform=f"platform{i % domains}", recipient=f"dpo@platform{i % domains}.example",
+               subject=f"Data protection request #{i}", body=body)
+        for i in range(count)
+    ]
+
+
+def bench_sequential(port: int, letters: List[Letter]) -> float:
+    started = time.perf_counter()
+    for letter in letters:
+        with smtplib.SMTP("127.0.0.1", port) as smtp:
+            smtp.ehlo()
+            smtp.sendmail("noreply@bench.example", [letter.recipient],
+                          f"Subject: {letter.subject}\r\n\r\n{letter.body}")
+    return time.perf_counter() - started
+
+
+def bench_dispatcher(port: int, letters: List[Letter], workers: int, batch_size: int) -> float:
+    with tempfile.TemporaryDirectory() as work:
+        jobs = DispatchQueue(os.path.join(work, "queue.db"))
+        pool = SMTPPool("127.0.0.1", port, starttls=False, size=workers)
+        # Generous limits: this measures transport throughput, not politeness.
+        throttle = DomainThrottle(rate=10_000, burst=10_000)
+        dispatcher = Dispatcher(jobs, pool, "noreply@bench.example", throttle,
+                                workers=workers, batch_size=batch_size, poll_interval=0.01)
+        started = time.perf_counter()
+        confirmation = Letter(platform="confirmation", recipient="user@bench.example",
+                              subject="Confirm", body="Confirm your request.")
+        jobs.enqueue(letters, reply_to="user@bench.example", token="bench", confirmation=confirmation)
+        jobs.confirm("bench")
+        dispatcher.start()
+        while jobs.pending():
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - started
+        dispatcher.stop()
+        jobs.close()
+    return elapsed
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark deletion-letter dispatch.")
+    parser.add_argument("--letters", type=int, default=500)
+    parser.add_argument("--domains", type=int, default=15)
+    parser.add_argument("--latency-ms", type=float, default=20, help="delay added to each SMTP reply")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    sink = SMTPSink(args.latency_ms / 1000)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    letters = make_letters(args.letters, args.domains)
+
+    results = {}
+    for label, run in (
+        ("sequential", lambda: bench_sequential(sink.port, letters)),
+        ("dispatcher", lambda: bench_dispatcher(sink.port, letters, args.workers, args.batch_size)),
+    ):
+        elapsed = run()
+        results[label] = {"seconds": round(elapsed, 3), "letters_per_second": round(len(letters) / elapsed, 1)}
+
+    sink.shutdown()
+    results["speedup"] = round(results["sequential"]["seconds"] / results["dispatcher"]["seconds"], 1)
+    print(json.dumps({"letters": args.letters, "domains": args.domains,
+                      "latency_ms": args.latency_ms, **results}, indent=2))
+    # Both runs send every letter; the dispatcher also sends one confirmation.
+    return 0 if sink.received == 2 * args.letters + 1 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
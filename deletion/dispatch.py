@@ -0,0 +1,300 @@
+# deletion/dispatch.py
+
+import os
+import time
+import queue
+import random
+import logging
+import smtplib
+import threading
+from contextlib import contextmanager
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from typing import Dict, Any, List, Optional
+
+from .queue import DispatchQueue
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPPool:
+    """
+    Bounded pool of authenticated SMTP sessions. A session is reused for
+    whole batches, so connect/EHLO/STARTTLS/AUTH is paid once per connection
+    instead of once per letter.
+    """
+
+    def __init__(self, host: str, port: int = 587, user: str = None, password: str = None,
+                 starttls: bool = True, size: int = 4, timeout: float = 30, max_idle: float = 60):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.starttls and smtp.has_extn("starttls"):
+            smtp.starttls()
+            smtp.ehlo()
+        if self.user:
+            smtp.login(self.user, self.password or "")
+        return smtp
+
+    @staticmethod
+    def _discard(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                smtp, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.time() - last_used < self.max_idle:
+                return smtp
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(smtp)
+
+    @contextmanager
+    def connection(self):
+        """
+        Yields a live session. If the block raises, the session may be
+        mid-transaction, so it is dropped instead of returned to the pool.
+        """
+        self._slots.acquire()
+        smtp = None
+        try:
+            smtp = self._checkout()
+            yield smtp
+        except Exception:
+            if smtp is not None:
+                self._discard(smtp)
+                smtp = None
+            raise
+        finally:
+            if smtp is not None:
+                self._idle.put((smtp, time.time()))
+            self._slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                smtp, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(smtp)
+
+
+class DomainThrottle:
+    """
+    Token bucket per recipient domain: `rate` letters per second with bursts
+    of up to `burst`.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, domain: str, wanted: int) -> int:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(domain, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            granted = min(wanted, int(tokens))
+            self._buckets[domain] = [tokens - granted, now]
+            return granted
+
+    def refund(self, domain: str, count: int) -> None:
+        with self._lock:
+            if domain in self._buckets:
+                bucket = self._buckets[domain]
+                bucket[0] = min(float(self.burst), bucket[0] + count)
+
+
+class Dispatcher:
+    """
+    Worker threads that drain a DispatchQueue: each picks a recipient domain
+    with due jobs, claims as many as that domain's throttle allows, and sends
+    them back to back over one pooled SMTP session.
+    """
+
+    def __init__(self, jobs: DispatchQueue, pool: SMTPPool, sender: str, throttle: DomainThrottle,
+                 workers: int = 4, batch_size: int = 20, max_attempts: int = 5, poll_interval: float = 0.5,
+                 sweep_interval: float = 60):
+        self.jobs = jobs
+        self.pool = pool
+        self.sender = sender
+        self.throttle = throttle
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for n in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"deletion-dispatch-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self) -> None:
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=10)
+        self._threads = []
+        self.pool.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                busy = self.run_once()
+            except Exception:
+                logger.exception("deletion dispatch worker failed")
+                busy = False
+            if not busy:
+                self._stop.wait(self.poll_interval)
+
+    def _sweep(self) -> None:
+        # One worker per interval expires letters whose link was never opened.
+        now = time.monotonic()
+        with self._sweep_lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+        expired = self.jobs.expire_unconfirmed()
+        if expired:
+            logger.info("expired %d unconfirmed deletion letters", expired)
+
+    def run_once(self) -> bool:
+        self._sweep()
+        domains = self.jobs.due_domains()
+        random.shuffle(domains)
+        for domain in domains:
+            granted = self.throttle.take(domain, self.batch_size)
+            if not granted:
+                continue
+            claimed = self.jobs.claim(domain, granted)
+            if len(claimed) < granted:
+                self.throttle.refund(domain, granted - len(claimed))
+            # A job past max_attempts here was reclaimed after its lease
+            # expired, i.e. its worker died while sending it. Stop retrying.
+            batch = []
+            for job in claimed:
+                if job["attempts"] > self.max_attempts:
+                    self.jobs.mark_failed(job, "gave up after repeated interrupted sends")
+                else:
+                    batch.append(job)
+            if batch:
+                self._send_batch(batch)
+            if claimed:
+                return True
+        return False
+
+    def _message(self, job: Dict[str, Any]) -> EmailMessage:
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = job["recipient"]
+        msg["Reply-To"] = job["reply_to"]
+        msg["Subject"] = job["subject"]
+        msg["Date"] = formatdate(localtime=True)
+        msg["Message-ID"] = make_msgid(domain=self.sender.rsplit("@", 1)[-1])
+        msg.set_content(job["body"])
+        return msg
+
+    def _fail(self, job: Dict[str, Any], error: str, permanent: bool) -> None:
+        if permanent or job["attempts"] >= self.max_attempts:
+            self.jobs.mark_failed(job, error)
+        else:
+            self.jobs.mark_failed(job, error, retry_in=min(3600, 30 * 2 ** (job["attempts"] - 1)))
+
+    def _send_batch(self, batch: List[Dict[str, Any]]) -> None:
+        sent, done = [], 0
+        try:
+            with self.pool.connection() as smtp:
+                for job in batch:
+                    try:
+                        message = self._message(job)
+                    except (ValueError, TypeError) as e:
+                        # Bad header data (e.g. CR/LF in an address) will
+                        # never succeed; fail it and carry on with the batch.
+                        self._fail(job, f"invalid message: {e}", permanent=True)
+                        done += 1
+                        continue
+                    try:
+                        smtp.send_message(message)
+                        sent.append(job["id"])
+                    except smtplib.SMTPRecipientsRefused as e:
+                        code, reply = next(iter(e.recipients.values()))
+                        self._fail(job, f"{code} {reply!r}", permanent=code >= 500)
+                    except smtplib.SMTPResponseException as e:
+                        self._fail(job, f"{e.smtp_code} {e.smtp_error!r}", permanent=e.smtp_code >= 500)
+                    done += 1
+        except (smtplib.SMTPException, OSError) as e:
+            # Connection-level failure: the rest of the batch is retried later.
+            for job in batch[done:]:
+                self._fail(job, str(e), permanent=False)
+        except Exception as e:
+            logger.exception("unexpected error sending deletion batch")
+            for job in batch[done:]:
+                self._fail(job, f"unexpected error: {e}", permanent=False)
+        finally:
+            self.jobs.mark_sent(sent)
+
+
+def dispatcher_from_env() -> Optional[Dispatcher]:
+    """
+    Builds a Dispatcher and its queue from SMTP_* / DISPATCH_* settings, or
+    None when no SMTP server is configured (then no queue file is created).
+    """
+    host = os.getenv("SMTP_HOST")
+    if not host:
+        return None
+    workers = int(os.getenv("DISPATCH_WORKERS", "4"))
+    pool = SMTPPool(
+        host,
+        int(os.getenv("SMTP_PORT", "587")),
+        user=os.getenv("SMTP_USER"),
+        password=os.getenv("SMTP_PASSWORD"),
+        starttls=os.getenv("SMTP_STARTTLS", "1") != "0",
+        size=int(os.getenv("SMTP_POOL_SIZE", str(workers))),
+    )
+    throttle = DomainThrottle(
+        rate=float(os.getenv("DISPATCH_DOMAIN_RATE", "1")),
+        burst=int(os.getenv("DISPATCH_DOMAIN_BURST", "10")),
+    )
+    sender = os.getenv("SMTP_FROM") or os.getenv("SMTP_USER")
+    if not sender:
+        raise RuntimeError("SMTP_FROM is missing from .env")
+    # Confirmation links must point at our own host, never at whatever Host
+    # header a request arrived with.
+    if not os.getenv("PUBLIC_API_URL"):
+        raise RuntimeError("PUBLIC_API_URL is missing from .env")
+    jobs = DispatchQueue(
+        os.getenv("DISPATCH_DB", "deletion_queue.db"),
+        lease_seconds=float(os.getenv("DISPATCH_LEASE_SECONDS", "300")),
+    )
+    return Dispatcher(jobs, pool, sender, throttle, workers=workers,
+                      max_attempts=int(os.getenv("DISPATCH_MAX_ATTEMPTS", "5")),
+                      batch_size=int(os.getenv("DISPATCH_BATCH_SIZE", "20")))
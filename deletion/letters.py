@@ -0,0 +1,115 @@
+# deletion/letters.py
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+_PLACEHOLDER = re.compile(r"\[(your [^\]]+|contact details|order IDs)\]")
+
+
+@dataclass
+class RequesterDetails:
+    full_name: str
+    email: str
+    phone: str = ""
+    country: str = ""
+    # Per-platform account identifier (username, customer ID, profile URL...).
+    accounts: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class Letter:
+    platform: str
+    recipient: str
+    subject: str
+    body: str
+
+    @property
+    def is_web_form(self) -> bool:
+        # Some platforms only take requests through a web form; their
+        # template "email" is the form URL.
+        return "@" not in self.recipient or self.recipient.lower().startswith(("http://", "https://"))
+
+    @property
+    def domain(self) -> str:
+        return self.recipient.rsplit("@", 1)[-1].lower()
+
+
+def _value(placeholder: str, platform: str, details: RequesterDetails) -> Optional[str]:
+    p = placeholder.lower()
+    if p in ("your full name", "your name"):
+        return details.full_name
+    if p == "contact details":
+        return "\n".join(v for v in (details.email, details.phone) if v)
+    if p == "your details":
+        return details.phone or details.email
+    if "email" in p:
+        return details.email
+    if p == "your phone":
+        return details.phone or None
+    if p == "your country":
+        return details.country or None
+    if p == "your subscriber id":
+        return None
+    if p.startswith("your ") and p.rsplit(" ", 1)[-1] in ("username", "id", "url"):
+        # The platform account: username, customer ID or profile URL.
+        return details.accounts.get(platform) or None
+    # Anything else (order IDs, ...) isn't collected; its line is dropped.
+    return None
+
+
+def render_letter(platform: str, template: Dict[str, str], details: RequesterDetails) -> Letter:
+    """
+    Fills the placeholders of a `platform_templates` entry. Lines whose
+    placeholder has no value (optional IDs, notes) are dropped rather than
+    sent with brackets in them.
+    """
+    lines = []
+    for line in template["body"].splitlines():
+        if line.startswith("[") and line.endswith("]") and not _PLACEHOLDER.fullmatch(line):
+            continue
+        missing = False
+
+        def fill(m):
+            nonlocal missing
+            value = _value(m.group(1), platform, details)
+            if value is None:
+                missing = True
+                return m.group(0)
+            return value
+
+        line = _PLACEHOLDER.sub(fill, line)
+        if not missing:
+            lines.append(line)
+
+    return Letter(
+        platform=platform,
+        recipient=template["email"],
+        subject=template["subject"],
+        body="\n".join(lines),
+    )
+
+
+def confirmation_letter(details: RequesterDetails, link: str, letters: List[Letter]) -> Letter:
+    """
+    The email that proves the requester owns `details.email`; nothing is
+    sent to the platforms until its link is opened.
+    """
+    platforms = "\n".join(f"- {l.platform}" for l in letters if not l.is_web_form)
+    body = f"""Hello {details.full_name},
+
+We received a request to send data deletion letters in your name to:
+
+{platforms}
+
+To confirm, open this link within 24 hours:
+
+{link}
+
+If you did not make this request, ignore this email and nothing will be sent."""
+    return Letter(
+        platform="confirmation",
+        recipient=details.email,
+        subject="Confirm your data deletion requests",
+        body=body,
+    )
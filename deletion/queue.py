@@ -0,0 +1,245 @@
+# deletion/queue.py
+
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, List, Optional
+
+from .letters import Letter
+
+UNCONFIRMED = "awaiting_confirmation"
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+MANUAL = "manual"
+EXPIRED = "expired"
+
+CONFIRMATION_PLATFORM = "confirmation"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    reply_to TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    next_attempt_at REAL NOT NULL,
+    claimed_by TEXT,
+    lease_expires_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, domain, next_attempt_at);
+CREATE INDEX IF NOT EXISTS jobs_request ON jobs (request_id);
+
+CREATE TABLE IF NOT EXISTS confirmations (
+    request_id TEXT PRIMARY KEY,
+    token_hash TEXT NOT NULL UNIQUE,
+    requester TEXT NOT NULL,
+    client_ip TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    confirmed_at REAL
+);
+CREATE INDEX IF NOT EXISTS confirmations_requester ON confirmations (requester, created_at);
+CREATE INDEX IF NOT EXISTS confirmations_ip ON confirmations (client_ip, created_at);
+"""
+
+# Jobs that are due: queued and past their backoff, or claimed by a worker
+# whose lease ran out (it died or hung mid-send).
+_DUE = "((status = ? AND next_attempt_at <= ?) OR (status = ? AND lease_expires_at <= ?))"
+
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class DispatchQueue:
+    """
+    Durable outbound queue of deletion letters, backed by SQLite so it can be
+    shared by several worker processes. Letters wait in UNCONFIRMED until the
+    requester clicks the confirmation link; workers claim jobs under a lease,
+    and only jobs whose lease has expired are taken over by another worker.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner = uuid.uuid4().hex
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {r["name"] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("claimed_by", "TEXT"), ("lease_expires_at", "REAL")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def _transaction(self, begin: str = "BEGIN"):
+        # The connection is shared by every thread, so a transaction left
+        # open by an exception would make each later BEGIN fail.
+        with self._lock:
+            self._conn.execute(begin)
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def enqueue(self, letters: Iterable[Letter], reply_to: str, token: str, confirmation: Letter,
+                client_ip: str = None, ttl: float = 24 * 3600) -> str:
+        """
+        Stores the letters as UNCONFIRMED and queues `confirmation` (the email
+        carrying `token` to the requester). Web-form letters are MANUAL.
+        """
+        request_id = uuid.uuid4().hex
+        now = time.time()
+        rows = [
+            (request_id, CONFIRMATION_PLATFORM, confirmation.recipient, confirmation.domain, reply_to,
+             confirmation.subject, confirmation.body, QUEUED, now, now, now)
+        ]
+        rows += [
+            (request_id, l.platform, l.recipient, "" if l.is_web_form else l.domain, reply_to,
+             l.subject, l.body, MANUAL if l.is_web_form else UNCONFIRMED, now, now, now)
+            for l in letters
+        ]
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO confirmations (request_id, token_hash, requester, client_ip, created_at, expires_at)"
+                " VALUES (?,?,?,?,?,?)",
+                (request_id, _token_hash(token), reply_to.lower(), client_ip, now, now + ttl),
+            )
+            conn.executemany(
+                "INSERT INTO jobs (request_id, platform, recipient, domain, reply_to, subject, body,"
+                " status, next_attempt_at, created_at, updated_at) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                rows,
+            )
+        return request_id
+
+    def confirm(self, token: str) -> Optional[str]:
+        """
+        Releases the letters of the request `token` belongs to. Returns the
+        request id, or None if the token is unknown, used or expired.
+        """
+        now = time.time()
+        with self._transaction("BEGIN IMMEDIATE") as conn:
+            row = conn.execute(
+                "SELECT request_id, expires_at FROM confirmations WHERE token_hash = ? AND confirmed_at IS NULL",
+                (_token_hash(token),),
+            ).fetchone()
+            if row is None:
+                return None
+            status = QUEUED if row["expires_at"] > now else EXPIRED
+            conn.execute(
+                "UPDATE jobs SET status = ?, next_attempt_at = ?, updated_at = ? WHERE request_id = ? AND status = ?",
+                (status, now, now, row["request_id"], UNCONFIRMED),
+            )
+            conn.execute(
+                "UPDATE confirmations SET confirmed_at = ? WHERE request_id = ?", (now, row["request_id"])
+            )
+        return row["request_id"] if status == QUEUED else None
+
+    def expire_unconfirmed(self) -> int:
+        """
+        Moves letters whose confirmation link has lapsed to EXPIRED and clears
+        their bodies, so unconfirmed personal data isn't kept around.
+        """
+        now = time.time()
+        with self._transaction("BEGIN IMMEDIATE") as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, body = '', updated_at = ? WHERE status = ? AND request_id IN"
+                " (SELECT request_id FROM confirmations WHERE confirmed_at IS NULL AND expires_at <= ?)",
+                (EXPIRED, now, UNCONFIRMED, now),
+            )
+        return cursor.rowcount
+
+    def recent_requests(self, since: float, requester: str = None, client_ip: str = None) -> int:
+        column, value = ("requester", requester.lower()) if requester else ("client_ip", client_ip)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM confirmations WHERE {column} = ? AND created_at >= ?", (value, since)
+            ).fetchone()[0]
+
+    def due_domains(self) -> List[str]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT domain FROM jobs WHERE {_DUE}", (QUEUED, now, SENDING, now)
+            ).fetchall()
+        return [r["domain"] for r in rows]
+
+    def claim(self, domain: str, limit: int) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._transaction("BEGIN IMMEDIATE") as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs WHERE domain = ? AND {_DUE} ORDER BY id LIMIT ?",
+                (domain, QUEUED, now, SENDING, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, claimed_by = ?, lease_expires_at = ?,"
+                " updated_at = ? WHERE id = ?",
+                [(SENDING, self.owner, now + self.lease_seconds, now, r["id"]) for r in rows],
+            )
+        jobs = [dict(r) for r in rows]
+        for job in jobs:
+            job["attempts"] += 1
+        return jobs
+
+    def _finish(self, sql: str, params: List[tuple]) -> None:
+        # Only touch jobs this queue still holds the lease for; an expired
+        # lease may already have been taken over by another worker.
+        with self._lock:
+            self._conn.executemany(
+                sql + ", claimed_by = NULL, lease_expires_at = NULL WHERE id = ? AND status = ? AND claimed_by = ?",
+                [p + (SENDING, self.owner) for p in params],
+            )
+
+    def mark_sent(self, job_ids: Iterable[int]) -> None:
+        now = time.time()
+        self._finish("UPDATE jobs SET status = ?, error = NULL, updated_at = ?", [(SENT, now, i) for i in job_ids])
+
+    def mark_failed(self, job: Dict[str, Any], error: str, retry_in: float = None) -> None:
+        now = time.time()
+        status = QUEUED if retry_in is not None else FAILED
+        self._finish(
+            "UPDATE jobs SET status = ?, error = ?, next_attempt_at = ?, updated_at = ?",
+            [(status, error, now + (retry_in or 0), now, job["id"])],
+        )
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, SENDING)
+            ).fetchone()[0]
+
+    def status(self, request_id: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT platform, recipient, status, attempts, error, updated_at FROM jobs"
+                " WHERE request_id = ? ORDER BY id",
+                (request_id,),
+            ).fetchall()
+        jobs = [dict(r) for r in rows]
+        counts: Dict[str, int] = {}
+        for job in jobs:
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"request_id": request_id, "counts": counts, "jobs": jobs}
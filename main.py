@@ -1,6 +1,17 @@
-from fastapi import FastAPI
-import requests
-from ndpa.checker import call_policy_analyzer
+import os
+import time
+import secrets
+from contextlib import asynccontextmanager
+from typing import Annotated, Dict, List, Optional
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, EmailStr, Field
+from breach.backends import get_backend
+from breach.results import BreachLookupError, iter_ndjson, paginate, parse_fields
+from ndpa.refresher import PolicyRefresher, analyze_policy_cached, policy_cache
+from ndpa import metrics
+from deletion.dispatch import dispatcher_from_env
+from deletion.letters import RequesterDetails, confirmation_letter, render_letter
 from fastapi.middleware.cors import CORSMiddleware
 
 platform_templates = {
@@ -37,6 +48,7 @@ Kind regards,
 
     "github": {
         "email": "dpo@github.com",
+        "policy_url": "https://docs.github.com/en/site-policy/privacy-policies/github-general-privacy-statement",
         "subject": "Data protection request regarding my GitHub account",
         "body": """Dear Data Protection Officer,
 
@@ -68,6 +80,7 @@ Kind regards,
 
     "spotify": {
         "email": "privacy@spotify.com",
+        "policy_url": "https://www.spotify.com/us/legal/privacy-policy/",
         "subject": "Data protection request regarding my Spotify account",
         "body": """Dear Data Protection Officer / Privacy Team,
 
@@ -164,6 +177,7 @@ Kind regards,
 
     "medium": {
         "email": "privacy@medium.com",
+        "policy_url": "https://policy.medium.com/medium-privacy-policy-f03bf92035c9",
         "subject": "Data protection request regarding my Medium account",
         "body": """Dear Privacy Team,
 
@@ -195,6 +209,7 @@ Kind regards,
 
     "reddit": {
         "email": "dpo@reddit.com",
+        "policy_url": "https://www.reddit.com/policies/privacy-policy",
         "subject": "Data protection request regarding my Reddit account",
         "body": """Dear Data Protection Officer,
 
@@ -226,6 +241,7 @@ Kind regards,
 
     "linkedin": {
         "email": "https://www.linkedin.com/help/linkedin/ask/TSO-DPO",
+        "policy_url": "https://www.linkedin.com/legal/privacy-policy",
         "subject": "Data protection request regarding my LinkedIn account",
         "body": """[Paste this text into the LinkedIn DPO web form:]
 
@@ -259,6 +275,7 @@ Kind regards,
 
     "tiktok": {
         "email": "https://www.tiktok.com/legal/report/dpo",
+        "policy_url": "https://www.tiktok.com/legal/page/row/privacy-policy/en",
         "subject": "Data protection request regarding my TikTok account",
         "body": """[Paste this text into the TikTok DPO web form:]
 
@@ -448,6 +465,7 @@ Kind regards,
 
     "pinterest": {
         "email": "privacy-support@pinterest.com",
+        "policy_url": "https://policy.pinterest.com/en/privacy-policy",
         "subject": "Data protection request regarding my Pinterest account",
         "body": """Dear Privacy Support / Data Protection Officer,
 
@@ -480,7 +498,26 @@ Kind regards,
     }
 }
 
-app = FastAPI()
+policy_refresher = PolicyRefresher()
+breach_backend = get_backend()
+deletion_dispatcher = dispatcher_from_env()
+deletion_queue = deletion_dispatcher.jobs if deletion_dispatcher else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    policy_cache.seed(t["policy_url"] for t in platform_templates.values() if t.get("policy_url"))
+    if os.getenv("POLICY_REFRESH_ENABLED", "1") != "0":
+        policy_refresher.start()
+    if deletion_dispatcher:
+        deletion_dispatcher.start()
+    yield
+    policy_refresher.stop()
+    if deletion_dispatcher:
+        deletion_dispatcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -491,17 +528,46 @@ app.add_middleware(
 )
 
 @app.get("/check_email/")
-def check_email(email: str):
-    url = "https://breachdirectory.p.rapidapi.com/"
-    querystring = {"func":"auto","term":email}
-    headers = {
-        "x-rapidapi-key": "8c7d8e7924msh339167a82eb0f0fp17bea2jsnc68e11701a7b",
-        "x-rapidapi-host": "breachdirectory.p.rapidapi.com"
-    }
-
-    response = requests.get(url, headers=headers, params=querystring)
-    email_result = {"message": f"Your email was found in {response.json()['found']} breaches." , "result": response.json()["result"]}
-    return email_result
+def check_email(
+    email: str,
+    view: str = Query("entries", pattern="^(entries|summary)$"),
+    page: int = Query(1, ge=1),
+    page_size: Optional[int] = Query(None, ge=1, le=1000),
+    fields: Optional[str] = None,
+    stream: bool = False,
+):
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        report = breach_backend.lookup(email)
+    except BreachLookupError as e:
+        return JSONResponse(status_code=502, content={"error": str(e)})
+
+    if view == "summary":
+        rows = report.summarize()
+        key = "sources"
+    else:
+        rows = [entry.to_dict(selected) for entry in report.entries]
+        key = "result"
+
+    header = {"message": report.message, "found": report.found, "total": len(rows),
+              "page": page, "page_size": page_size}
+    rows = paginate(rows, page, page_size)
+
+    if stream:
+        return StreamingResponse(iter_ndjson(header, rows), media_type="application/x-ndjson")
+    return {**header, key: rows}
+
+@app.get("/check_email_range/")
+def check_email_range(prefix: str = Query(..., min_length=5, max_length=32, pattern="^[0-9a-fA-F]+$"),
+                      limit: int = Query(1000, ge=1, le=10000)):
+    try:
+        matches = breach_backend.prefix_range(prefix, limit)
+    except NotImplementedError as e:
+        return {"error": str(e)}
+    return {"prefix": prefix.lower(), "count": len(matches), "matches": matches}
 
 @app.get("/request_deletion/")
 def request_deletion(platform: str):
@@ -512,6 +578,105 @@ def request_deletion(platform: str):
         return {"error": "Platform not supported."}
 
 
+DISPATCH_CONFIRM_TTL = 24 * 3600
+DISPATCH_MAX_PER_EMAIL = int(os.getenv("DISPATCH_MAX_PER_EMAIL", "3"))   # per day
+DISPATCH_MAX_PER_IP = int(os.getenv("DISPATCH_MAX_PER_IP", "10"))        # per hour
+
+_SINGLE_LINE = r"^[^\r\n]*$"
+
+
+class DeletionDispatchRequest(BaseModel):
+    platforms: List[str] = Field(..., max_length=50)  # platform_templates keys, or ["all"]
+    full_name: str = Field(..., min_length=1, max_length=200, pattern=_SINGLE_LINE)
+    email: EmailStr
+    phone: str = Field("", max_length=50, pattern=_SINGLE_LINE)
+    country: str = Field("", max_length=100, pattern=_SINGLE_LINE)
+    # Platform name -> account identifier; each value lands in a letter body.
+    accounts: Dict[
+        Annotated[str, Field(max_length=50)],
+        Annotated[str, Field(max_length=200, pattern=_SINGLE_LINE)],
+    ] = Field({}, max_length=50)
+
+
+@app.post("/request_deletion/dispatch/")
+def dispatch_deletion(request: DeletionDispatchRequest, http_request: Request):
+    if deletion_dispatcher is None:
+        return {"error": "Email dispatch is not configured."}
+
+    client_ip = http_request.client.host if http_request.client else None
+    now = time.time()
+    if deletion_queue.recent_requests(now - 24 * 3600, requester=request.email) >= DISPATCH_MAX_PER_EMAIL:
+        raise HTTPException(status_code=429, detail="Too many deletion requests for this email address today.")
+    if client_ip and deletion_queue.recent_requests(now - 3600, client_ip=client_ip) >= DISPATCH_MAX_PER_IP:
+        raise HTTPException(status_code=429, detail="Too many deletion requests, try again later.")
+
+    names = list(dict.fromkeys(p.lower() for p in request.platforms))
+    if "all" in names:
+        names = list(platform_templates)
+    details = RequesterDetails(
+        full_name=request.full_name,
+        email=request.email,
+        phone=request.phone,
+        country=request.country,
+        accounts={k.lower(): v for k, v in request.accounts.items()},
+    )
+    letters = [render_letter(p, platform_templates[p], details) for p in names if p in platform_templates]
+    emailed = [l for l in letters if not l.is_web_form]
+
+    request_id = None
+    if emailed:
+        # Nothing goes to the platforms until the requester proves they own
+        # the address, by opening the link sent to it.
+        token = secrets.token_urlsafe(32)
+        link = f"{os.environ['PUBLIC_API_URL'].rstrip('/')}/request_deletion/confirm/?token={token}"
+        request_id = deletion_queue.enqueue(
+            letters, reply_to=request.email, token=token,
+            confirmation=confirmation_letter(details, link, letters),
+            client_ip=client_ip, ttl=DISPATCH_CONFIRM_TTL,
+        )
+
+    return {
+        "request_id": request_id,
+        "awaiting_confirmation": [l.platform for l in emailed],
+        # Web-form-only platforms: the user submits the rendered text themselves.
+        "manual": [
+            {"platform": l.platform, "url": l.recipient, "subject": l.subject, "body": l.body}
+            for l in letters if l.is_web_form
+        ],
+        "unsupported": [p for p in names if p not in platform_templates],
+    }
+
+
+@app.get("/request_deletion/confirm/")
+def confirm_deletion(token: str):
+    if deletion_queue is None:
+        return {"error": "Email dispatch is not configured."}
+    request_id = deletion_queue.confirm(token)
+    if request_id is None:
+        return JSONResponse(status_code=404, content={"error": "Confirmation link is invalid, used or expired."})
+    return {"request_id": request_id, "message": "Confirmed. Your deletion requests are being sent."}
+
+
+@app.get("/request_deletion/status/")
+def deletion_status(request_id: str):
+    if deletion_queue is None:
+        return {"error": "Email dispatch is not configured."}
+    status = deletion_queue.status(request_id)
+    if not status["jobs"]:
+        return {"error": "Request not found."}
+    return status
+
+
 @app.get("/privacy_policy_check/")
 def privacy_policy_check(input: str):
-    return call_policy_analyzer(input)
\ No newline at end of file
+    return analyze_policy_cached(input)
+
+
+@app.get("/metrics/", include_in_schema=False)
+def get_metrics(x_metrics_token: Optional[str] = Header(None)):
+    # Internal only: disabled unless METRICS_TOKEN is set, then the caller
+    # must send it in the X-Metrics-Token header.
+    expected = os.getenv("METRICS_TOKEN")
+    if not expected or not x_metrics_token or not secrets.compare_digest(x_metrics_token, expected):
+        raise HTTPException(status_code=404)
+    return metrics.snapshot()
@@ -1,9 +1,15 @@
 import re
+import os
 import json
+import time
+import codecs
+import socket
+import ipaddress
+from urllib.parse import urljoin, urlparse
+from html.parser import HTMLParser
 from pathlib import Path
 from typing import Dict, Any
 import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
 # change 
@@ -11,28 +17,191 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from .xai_client import call_xai_compare
+from . import metrics
+
+MAX_POLICY_CHARS = 120000
+MAX_POLICY_BYTES = int(os.getenv("POLICY_MAX_BYTES", str(5 * 1024 * 1024)))
+ALLOWED_CONTENT_TYPES = tuple(
+    t.strip() for t in os.getenv(
+        "POLICY_CONTENT_TYPES", "text/html,application/xhtml+xml,text/plain"
+    ).split(",") if t.strip()
+)
+_CHUNK_SIZE = 64 * 1024
+_MAX_REDIRECTS = 5
+_SKIP_TAGS = {"script", "style", "noscript", "header", "footer", "nav", "form", "template", "svg"}
+
 
 def read_file(path: str) -> str:
     return Path(path).read_text(encoding="utf-8")
 
-def scrape_policy_from_url(url: str) -> str:
+
+class _PolicyTextParser(HTMLParser):
+    """
+    Incremental HTML -> text extractor. Text inside non-content tags is dropped
+    as it streams past, and visible text is appended to a buffer capped at
+    `max_chars`, so neither the full HTML nor a tree is ever held in memory.
+    """
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts = []
+        self.size = 0
+        self.full = False
+        self._skip_depth = 0
+        # True when the next piece of text starts a new word: after a tag or
+        # whitespace. HTMLParser hands over text in pieces that follow feed()
+        # boundaries, so a piece ending mid-word is continued, not separated.
+        self._boundary = False
+
+    def handle_starttag(self, tag, attrs):
+        self._boundary = True
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self._boundary = True
+        if tag in _SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.add_text(data)
+
+    def add_text(self, data: str):
+        if self.full or not data:
+            return
+        chunk = " ".join(data.split())
+        if not chunk:
+            self._boundary = True
+            return
+        if self.parts and (self._boundary or data[0].isspace()):
+            chunk = " " + chunk
+        self._boundary = data[-1].isspace()
+        room = self.max_chars - self.size
+        if len(chunk) >= room:
+            chunk = chunk[:room]
+            self.full = True
+        self.parts.append(chunk)
+        self.size += len(chunk)
+
+    def text(self) -> str:
+        return "".join(self.parts).strip()
+
+
+def check_public_url(url: str) -> None:
+    """
+    Raises ValueError unless `url` is http(s) and its host resolves only to
+    public addresses, so user-supplied links can't reach internal services.
+    """
+    parts = urlparse(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("only http(s) URLs are supported")
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or 0, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"cannot resolve host '{parts.hostname}': {e}")
+    for info in infos:
+        ip = ipaddress.ip_address(info[4][0].split("%")[0])
+        if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global:
+            raise ValueError(f"host '{parts.hostname}' is not a public address")
+
+
+def fetch_policy(url: str, etag: str = None, last_modified: str = None,
+                 max_bytes: int = MAX_POLICY_BYTES, max_chars: int = MAX_POLICY_CHARS) -> Dict[str, Any]:
+    """
+    Fetches a policy page and extracts its text. Passing the `etag` /
+    `last_modified` of a previous fetch makes the request conditional; on a
+    304 the returned "text" is None.
+    """
+    started = time.perf_counter()
+    rss_start = metrics.current_rss_kb()
+    rss_peak = rss_start
+    received = 0
     try:
         headers = {"User-Agent": "shadow-data-ndpa-checker/1.0"}
-        resp = requests.get(url, timeout=12, headers=headers)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        for tag in soup(["script", "style", "noscript", "header", "footer", "nav", "form"]):
-            tag.extract()
-
-        text = soup.get_text(separator="\n", strip=True)
-        text = re.sub(r'\n\s*\n+', '\n\n', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        # Redirects are followed by hand so every hop is checked.
+        target = url
+        for _ in range(_MAX_REDIRECTS + 1):
+            check_public_url(target)
+            resp = requests.get(target, timeout=12, headers=headers, stream=True, allow_redirects=False)
+            if not resp.is_redirect:
+                break
+            resp.close()
+            target = urljoin(target, resp.headers["Location"])
+        else:
+            raise ValueError("too many redirects")
+
+        with resp:
+            result = {
+                "status": resp.status_code,
+                "text": None,
+                "etag": resp.headers.get("ETag", etag),
+                "last_modified": resp.headers.get("Last-Modified", last_modified),
+            }
+            if resp.status_code == 304:
+                return result
+            resp.raise_for_status()
+
+            content_type = resp.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in ALLOWED_CONTENT_TYPES:
+                raise ValueError(f"unsupported content type '{content_type}'")
+            declared = resp.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise ValueError(f"page is {declared} bytes, limit is {max_bytes}")
+
+            parser = _PolicyTextParser(max_chars)
+            is_html = content_type != "text/plain"
+            feed = parser.feed if is_html else parser.add_text
+            try:
+                decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+            except LookupError:
+                # Charset Python doesn't know (e.g. "utf8mb4"): decode as UTF-8.
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+            for chunk in resp.iter_content(chunk_size=_CHUNK_SIZE):
+                received += len(chunk)
+                if received > max_bytes:
+                    raise ValueError(f"page exceeds limit of {max_bytes} bytes")
+                feed(decoder.decode(chunk))
+                rss = metrics.current_rss_kb()
+                if rss is not None and (rss_peak is None or rss > rss_peak):
+                    rss_peak = rss
+                if parser.full:
+                    break
+            else:
+                feed(decoder.decode(b"", final=True))
+                if is_html:
+                    parser.close()
+
+        result["text"] = parser.text()
+        return result
 
     except Exception as e:
         raise RuntimeError(f"Error scraping URL: {e}")
 
+    finally:
+        metrics.record(
+            "scrape_policy",
+            host=urlparse(url).hostname,
+            bytes=received,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+            rss_start_kb=rss_start,
+            peak_rss_kb=rss_peak,
+            process_peak_rss_kb=metrics.peak_rss_kb(),
+        )
+
+
+def scrape_policy_from_url(url: str, max_bytes: int = MAX_POLICY_BYTES, max_chars: int = MAX_POLICY_CHARS) -> str:
+    return fetch_policy(url, max_bytes=max_bytes, max_chars=max_chars)["text"]
+
 # -------------------------
 # System prompt
 # -------------------------
@@ -160,26 +329,38 @@ def call_policy_analyzer(policy_text: str) -> Dict[str, Any]:
 # Entrypoint
 # -------------------------
 
+def is_policy_url(input_value: str) -> bool:
+    return input_value.lower().startswith(("http://", "https://"))
+
+
+def scrape_error_result(error: Exception) -> Dict[str, Any]:
+    return {
+        "explanation": "Not specified",
+        "data_they_collect": {"items": []},
+        "usage_and_sharing": {"usage_purposes": [], "third_parties": []},
+        "deletion_and_your_rights": {"data_retention": "Not specified", "your_rights": []},
+        "ndpr_check": {"overall_compliance": "Unknown", "strengths": [], "gaps": [str(error)], "questions_to_ask": []},
+        "gdpr_check": {"overall_compliance": "Unknown", "strengths": [], "gaps": [str(error)], "questions_to_ask": []},
+        "changes_needed_to_be_ndpr_compliant": [],
+        "changes_needed_to_be_gdpr_compliant": []
+    }
+
+
+def analyze_policy_text(policy_text: str) -> Dict[str, Any]:
+    if len(policy_text) >= MAX_POLICY_CHARS:
+        policy_text = policy_text[:MAX_POLICY_CHARS] + "\n\n[TRUNCATED]"
+
+    return call_policy_analyzer(policy_text)
+
+
 def analyze_policy_input(input_value: str) -> Dict[str, Any]:
-    if input_value.lower().startswith(("http://", "https://")):
+    if is_policy_url(input_value):
         try:
             policy_text = scrape_policy_from_url(input_value)
         except Exception as e:
-            return {
-                "explanation": "Not specified",
-                "data_they_collect": {"items": []},
-                "usage_and_sharing": {"usage_purposes": [], "third_parties": []},
-                "deletion_and_your_rights": {"data_retention": "Not specified", "your_rights": []},
-                "ndpr_check": {"overall_compliance": "Unknown", "strengths": [], "gaps": [str(e)], "questions_to_ask": []},
-                "gdpr_check": {"overall_compliance": "Unknown", "strengths": [], "gaps": [str(e)], "questions_to_ask": []},
-                "changes_needed_to_be_ndpr_compliant": [],
-                "changes_needed_to_be_gdpr_compliant": []
-            }
+            return scrape_error_result(e)
     else:
         policy_text = input_value
 
-    if len(policy_text) > 120000:
-        policy_text = policy_text[:120000] + "\n\n[TRUNCATED]"
-
-    return call_policy_analyzer(policy_text)
+    return analyze_policy_text(policy_text)
 
@@ -0,0 +1,48 @@
+# ndpa/metrics.py
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module
+    resource = None
+
+_MAX_RECORDS = 500
+
+_lock = threading.Lock()
+_records: Dict[str, deque] = {}
+
+
+def peak_rss_kb() -> Optional[int]:
+    """
+    Peak resident set size of this process in KiB, or None if unavailable.
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def current_rss_kb() -> Optional[int]:
+    """
+    Current resident set size in KiB (Linux only), or None if unavailable.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * (resource.getpagesize() if resource else 4096) // 1024
+
+
+def record(name: str, **fields: Any) -> None:
+    fields["ts"] = time.time()
+    with _lock:
+        _records.setdefault(name, deque(maxlen=_MAX_RECORDS)).append(fields)
+
+
+def snapshot() -> Dict[str, List[Dict[str, Any]]]:
+    with _lock:
+        return {name: list(rows) for name, rows in _records.items()}
@@ -0,0 +1,317 @@
+# ndpa/refresher.py
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from urllib.parse import urlparse
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, Optional
+
+from .checker import (
+    MAX_POLICY_CHARS,
+    analyze_policy_text,
+    fetch_policy,
+    is_policy_url,
+    scrape_error_result,
+)
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL = float(os.getenv("POLICY_CACHE_TTL", str(6 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("POLICY_CACHE_MAX_ENTRIES", "2000"))
+REFRESH_INTERVAL = float(os.getenv("POLICY_REFRESH_INTERVAL", "1800"))
+REFRESH_TOP_N = int(os.getenv("POLICY_REFRESH_TOP_N", "300"))
+REFRESH_CONCURRENCY = int(os.getenv("POLICY_REFRESH_CONCURRENCY", "4"))
+REFRESH_TOKEN_BUDGET = int(os.getenv("POLICY_REFRESH_TOKEN_BUDGET", "500000"))
+
+# Prompt scaffolding plus the JSON answer, on top of the policy text itself.
+_TOKENS_PER_ANALYSIS = 2500
+
+
+def source_key(input_value: str) -> str:
+    value = input_value.strip()
+    if is_policy_url(value):
+        return value
+    return "text:" + hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    return min(len(text), MAX_POLICY_CHARS) // 4 + _TOKENS_PER_ANALYSIS
+
+
+class PolicyCache:
+    """
+    LRU cache of analysis results keyed by source (URL, or a hash of pasted
+    text), plus the request counts the refresher uses to pick what to keep warm.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._hits: Counter = Counter()
+        self._seeds = set()
+        self._inflight: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, **fields: Any) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._entries.get(key, {})
+            entry.update(fields)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                if evicted not in self._seeds:
+                    self._hits.pop(evicted, None)
+            return entry
+
+    def has_result(self, key: str) -> bool:
+        with self._lock:
+            return "result" in self._entries.get(key, {})
+
+    @contextmanager
+    def source_lock(self, key: str):
+        """
+        Serialises fetch + analysis per source, so concurrent misses for the
+        same policy wait for one LLM call instead of each making their own.
+        """
+        with self._lock:
+            slot = self._inflight.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if not slot[1]:
+                    del self._inflight[key]
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return "result" in entry and time.time() - entry.get("checked_at", 0) < self.ttl
+
+    def count_request(self, key: str) -> None:
+        # Pasted text is never refreshed, so only URLs are counted; counts
+        # for URLs that fall out of the LRU are dropped on eviction.
+        if not is_policy_url(key):
+            return
+        with self._lock:
+            if key in self._entries or key in self._seeds:
+                self._hits[key] += 1
+
+    def seed(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._seeds.add(key)
+                self._hits.setdefault(key, 0)
+
+    def top_sources(self, n: int) -> list:
+        # Only seeds and URLs that have been analyzed successfully are
+        # refreshed; arbitrary links users submit are never polled.
+        with self._lock:
+            urls = [
+                (k, c) for k, c in self._hits.items()
+                if is_policy_url(k) and (k in self._seeds or "result" in self._entries.get(k, {}))
+            ]
+        urls.sort(key=lambda kc: kc[1], reverse=True)
+        return [k for k, _ in urls[:n]]
+
+    def decay(self) -> None:
+        # Halve counts each cycle so popularity follows recent traffic.
+        with self._lock:
+            for key in list(self._hits):
+                self._hits[key] //= 2
+                if not self._hits[key] and key not in self._seeds:
+                    del self._hits[key]
+
+
+policy_cache = PolicyCache()
+
+
+def _analyze_and_store(cache: PolicyCache, key: str, text: str, fetched: Dict[str, Any]) -> Dict[str, Any]:
+    result = analyze_policy_text(text)
+    now = time.time()
+    if isinstance(result, dict):
+        cache.put(
+            key,
+            result=result,
+            content_hash=content_hash(text),
+            etag=fetched.get("etag"),
+            last_modified=fetched.get("last_modified"),
+            analyzed_at=now,
+            checked_at=now,
+        )
+    return result
+
+
+def _refresh_source(cache: PolicyCache, key: str, input_value: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    if not is_policy_url(key):
+        return _analyze_and_store(cache, key, input_value, {})
+
+    try:
+        fetched = fetch_policy(key, entry.get("etag"), entry.get("last_modified"))
+        if fetched["text"] is None and "result" not in entry:
+            # 304 for a validator we no longer hold a result for.
+            fetched = fetch_policy(key)
+    except Exception as e:
+        if "result" in entry:
+            logger.warning("re-fetch failed for %s, serving cached analysis: %s", urlparse(key).hostname, e)
+            return entry["result"]
+        return scrape_error_result(e)
+
+    if "result" in entry and (
+        fetched["text"] is None or content_hash(fetched["text"]) == entry.get("content_hash")
+    ):
+        cache.put(key, checked_at=time.time(), etag=fetched["etag"], last_modified=fetched["last_modified"])
+        return entry["result"]
+
+    result = _analyze_and_store(cache, key, fetched["text"], fetched)
+    if not isinstance(result, dict) and "result" in entry:
+        return entry["result"]
+    return result
+
+
+def analyze_policy_cached(input_value: str, cache: PolicyCache = policy_cache) -> Dict[str, Any]:
+    started = time.perf_counter()
+    key = source_key(input_value)
+
+    entry = cache.get(key)
+    hit = entry is not None and cache.is_fresh(entry)
+    try:
+        if hit:
+            return entry["result"]
+
+        with cache.source_lock(key):
+            # Another request may have finished this source while we waited.
+            entry = cache.get(key) or {}
+            if cache.is_fresh(entry):
+                return entry["result"]
+            return _refresh_source(cache, key, input_value, entry)
+
+    finally:
+        if cache.has_result(key):
+            cache.count_request(key)
+        metrics.record(
+            "policy_check",
+            host=urlparse(key).hostname if is_policy_url(key) else "text",
+            cache_hit=hit,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+
+
+class PolicyRefresher:
+    """
+    Background thread that keeps the most requested policy URLs warm: each
+    cycle it conditionally re-fetches the top-N sources and re-analyzes only
+    those whose text changed, within a per-cycle token budget.
+    """
+
+    def __init__(self, cache: PolicyCache = policy_cache, interval: float = REFRESH_INTERVAL,
+                 top_n: int = REFRESH_TOP_N, concurrency: int = REFRESH_CONCURRENCY,
+                 token_budget: int = REFRESH_TOKEN_BUDGET):
+        self.cache = cache
+        self.interval = interval
+        self.top_n = top_n
+        self.concurrency = concurrency
+        self.token_budget = token_budget
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="policy-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_cycle()
+            except Exception:
+                logger.exception("policy refresh cycle failed")
+            self._stop.wait(self.interval)
+
+    def _check(self, key: str) -> Optional[tuple]:
+        entry = self.cache.get(key) or {}
+        if "result" not in entry:
+            return key, fetch_policy(key)
+        fetched = fetch_policy(key, entry.get("etag"), entry.get("last_modified"))
+        if fetched["text"] is None or content_hash(fetched["text"]) == entry.get("content_hash"):
+            self.cache.put(key, checked_at=time.time(), etag=fetched["etag"], last_modified=fetched["last_modified"])
+            return None
+        return key, fetched
+
+    def _reanalyze(self, key: str, fetched: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self.cache.source_lock(key):
+            entry = self.cache.get(key) or {}
+            if entry.get("content_hash") == content_hash(fetched["text"]):
+                # A user request analyzed this version while we were fetching.
+                return entry["result"]
+            return _analyze_and_store(self.cache, key, fetched["text"], fetched)
+
+    def run_cycle(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        sources = self.cache.top_sources(self.top_n)
+        stats = {"sources": len(sources), "unchanged": 0, "changed": 0, "analyzed": 0,
+                 "deferred": 0, "errors": 0, "tokens": 0}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            changed = []
+            for key, future in [(k, pool.submit(self._check, k)) for k in sources]:
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    logger.warning("refresh fetch failed for %s: %s", urlparse(key).hostname, e)
+                    stats["errors"] += 1
+                    continue
+                if outcome is None:
+                    stats["unchanged"] += 1
+                else:
+                    changed.append(outcome)
+            stats["changed"] = len(changed)
+
+            # `sources` is ordered by popularity, so the budget goes to the
+            # most requested policies first; the rest wait for the next cycle.
+            jobs = []
+            for key, fetched in changed:
+                cost = estimate_tokens(fetched["text"])
+                if stats["tokens"] + cost > self.token_budget:
+                    stats["deferred"] += 1
+                    continue
+                stats["tokens"] += cost
+                jobs.append(pool.submit(self._reanalyze, key, fetched))
+            for job in jobs:
+                try:
+                    ok = isinstance(job.result(), dict)
+                except Exception:
+                    logger.exception("refresh analysis failed")
+                    ok = False
+                stats["analyzed" if ok else "errors"] += 1
+
+        self.cache.decay()
+        stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        metrics.record("policy_refresh", **stats)
+        return stats
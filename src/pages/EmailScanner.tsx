@@ -7,19 +7,21 @@ import Pill from "@/components/Pill";
 import { useToast } from "@/hooks/use-toast";
 import { useNavigate } from "react-router-dom";
 
-// API response format - matches actual backend response
-interface BreachResult {
-  email: string;
-  hash_password: boolean;
-  password: string;
-  sha1: string;
-  hash: string;
-  sources: string;
+// API response format - matches backend response for view=summary
+interface BreachSourceSummary {
+  source: string;
+  count: number;
+  earliest: string | null;
+  latest: string | null;
+  has_password: boolean;
+  fields: string[];
 }
 
 interface ScanResponse {
   message: string;
-  result: BreachResult[];
+  found: number;
+  total: number;
+  sources: BreachSourceSummary[];
 }
 
 // Parsed service from sources
@@ -42,34 +44,25 @@ const EmailScanner = () => {
   const [confirmedServices, setConfirmedServices] = useState<ConfirmedService[]>([]);
   const [hasResults, setHasResults] = useState(false);
 
-  // Parse sources string into individual services
-  const parseSourcesIntoServices = (results: BreachResult[]): ConfirmedService[] => {
+  // Map per-source summaries (already grouped by the backend) to services
+  const parseSourcesIntoServices = (summaries: BreachSourceSummary[]): ConfirmedService[] => {
     const servicesMap = new Map<string, ConfirmedService>();
     
-    results.forEach((result) => {
-      // Sources can be comma-separated or a single value
-      const sources = result.sources?.split(",").map(s => s.trim()).filter(s => s.length > 0) || [];
+    summaries.forEach((summary) => {
+      // Clean up the source name (remove .com, etc. for cleaner display)
+      const cleanName = summary.source.replace(/\.(com|org|net|io|co)$/i, "");
+      const id = cleanName.toLowerCase().replace(/[^a-z0-9]/g, "");
       
-      sources.forEach((source) => {
-        // Clean up the source name (remove .com, etc. for cleaner display)
-        const cleanName = source.replace(/\.(com|org|net|io|co)$/i, "");
-        const id = cleanName.toLowerCase().replace(/[^a-z0-9]/g, "");
-        
-        if (!servicesMap.has(id)) {
-          servicesMap.set(id, {
-            id,
-            name: cleanName,
-            hasPassword: result.hash_password || false,
-            addedToDeleteList: false,
-          });
-        } else {
-          // If already exists and this result has password leaked, update it
-          const existing = servicesMap.get(id)!;
-          if (result.hash_password) {
-            existing.hasPassword = true;
-          }
-        }
-      });
+      if (!servicesMap.has(id)) {
+        servicesMap.set(id, {
+          id,
+          name: cleanName,
+          hasPassword: summary.has_password,
+          addedToDeleteList: false,
+        });
+      } else if (summary.has_password) {
+        servicesMap.get(id)!.hasPassword = true;
+      }
     });
     
     return Array.from(servicesMap.values());
@@ -91,7 +84,7 @@ const EmailScanner = () => {
     setHasResults(false);
 
     try {
-      const response = await fetch(`${API_BASE_URL}/check_email/?email=${encodeURIComponent(email)}`, {
+      const response = await fetch(`${API_BASE_URL}/check_email/?email=${encodeURIComponent(email)}&view=summary`, {
         method: "GET",
         headers: {
           "Content-Type": "application/json",
@@ -106,8 +99,8 @@ const EmailScanner = () => {
       
       setScanMessage(data.message);
       
-      if (data.result && data.result.length > 0) {
-        const services = parseSourcesIntoServices(data.result);
+      if (data.sources && data.sources.length > 0) {
+        const services = parseSourcesIntoServices(data.sources);
         setConfirmedServices(services);
       }
       
@@ -0,0 +1,6 @@
+import os
+
+# main.py and ndpa.xai_client refuse to import without API keys; tests never
+# call either service.
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+os.environ.setdefault("RAPIDAPI_KEY", "test")
@@ -0,0 +1,73 @@
+import hashlib
+
+import pytest
+
+from breach.backends import LocalIndexBackend
+from breach.build_index import build_index
+from breach.index import BreachIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    canva = tmp_path / "canva.txt"
+    canva.write_text(
+        "Alice@Example.com:hunter2\n"
+        "bob@example.com\n"
+        "alice@example.com:5f4dcc3b5aa765d61d8327deb882cf99\n"
+        "\n"
+    )
+    adobe = tmp_path / "adobe.txt"
+    adobe.write_text("alice@example.com\n")
+
+    out = tmp_path / "breaches.idx"
+    stats = build_index(str(out), [(str(canva), "Canva", "2019-05"), (str(adobe), "Adobe", "")], chunk_records=2)
+    assert stats["records_read"] == 4
+    assert stats["records_written"] == 3
+
+    with BreachIndex(str(out)) as idx:
+        yield idx
+
+
+def test_lookup_merges_duplicates_per_source(index):
+    records = {r["source"]: r for r in index.lookup("  ALICE@example.com ")}
+
+    assert set(records) == {"Canva", "Adobe"}
+    assert records["Canva"]["has_password"] and records["Canva"]["has_hash"]
+    assert records["Canva"]["last_breach"] == "2019-05"
+    assert not records["Adobe"]["has_password"]
+    assert records["Adobe"]["last_breach"] is None
+
+
+def test_lookup_miss(index):
+    assert index.lookup("nobody@example.com") == []
+
+
+@pytest.mark.parametrize("digits", [5, 6, 31, 32, 64])
+def test_prefix_range_finds_identifier(index, digits):
+    # Callers hash the full SHA-256; the index stores its first 32 hex digits.
+    full = hashlib.sha256(b"bob@example.com").hexdigest()
+    matches = index.prefix_range(full[:digits])
+
+    assert [m["source"] for m in matches] == ["Canva"]
+    assert matches[0]["hash"] == full[:32]
+
+
+def test_prefix_range_limit(index):
+    assert len(index.prefix_range("", limit=2)) == 2
+    assert len(index.prefix_range("")) == 3
+
+
+def test_local_backend_keeps_password_and_hash_leaks_apart(tmp_path):
+    dump = tmp_path / "linkedin.txt"
+    dump.write_text("carol@example.com:5f4dcc3b5aa765d61d8327deb882cf99\n")
+    plain = tmp_path / "canva.txt"
+    plain.write_text("carol@example.com:hunter2\n")
+    out = tmp_path / "breaches.idx"
+    build_index(str(out), [(str(dump), "LinkedIn", ""), (str(plain), "Canva", "")])
+
+    backend = LocalIndexBackend(str(out))
+    rows = {r["source"]: r for r in backend.lookup("carol@example.com").summarize()}
+    assert rows["LinkedIn"]["fields"] == ["email", "hash"]
+    assert not rows["LinkedIn"]["has_password"]
+    assert rows["Canva"]["fields"] == ["email", "password"]
+    backend.index.close()
@@ -0,0 +1,40 @@
+import pytest
+
+from breach.results import BreachLookupError, BreachReport, parse_fields
+
+
+def test_report_parses_and_summarizes_entries():
+    report = BreachReport.from_response({
+        "success": True,
+        "found": 2,
+        "result": [
+            {"email": True, "hash_password": True, "password": "ab**", "sources": "Canva.com, Adobe.com", "last_breach": "2019-05"},
+            {"email": True, "hash_password": False, "sources": "Canva.com", "last_breach": "2017-01"},
+        ],
+    })
+
+    assert report.found == 2
+    canva = report.summarize()[0]
+    assert canva["source"] == "Canva.com"
+    assert canva["count"] == 2
+    assert (canva["earliest"], canva["latest"]) == ("2017-01", "2019-05")
+    assert canva["has_password"] is True
+
+
+@pytest.mark.parametrize("payload", [
+    {"message": "You are not subscribed to this API."},
+    {"success": False, "found": 0},
+    {"found": 1, "result": "oops"},
+    ["not", "a", "dict"],
+])
+def test_error_payloads_are_not_reported_as_zero_breaches(payload):
+    with pytest.raises(BreachLookupError):
+        BreachReport.from_response(payload)
+
+
+def test_parse_fields():
+    assert parse_fields(None) is None
+    assert parse_fields(" , ") is None
+    assert parse_fields("sources, hash_password") == ("sources", "hash_password")
+    with pytest.raises(ValueError):
+        parse_fields("sources,bogus")
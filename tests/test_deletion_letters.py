@@ -0,0 +1,68 @@
+import pytest
+
+from deletion.letters import RequesterDetails, render_letter
+from main import platform_templates
+
+ACCOUNT = "acct-4821"
+
+# The one line each template fills from RequesterDetails.accounts.
+ACCOUNT_LINES = {
+    "kuda": None,
+    "github": "- GitHub username: acct-4821",
+    "spotify": "- Spotify username / display name: acct-4821",
+    "bet9ja": "- Bet9ja username / customer ID: acct-4821",
+    "sportbet": "- SportyBet username / customer ID: acct-4821",
+    "medium": "- Medium username: acct-4821",
+    "reddit": "- Reddit username: acct-4821",
+    "linkedin": "- LinkedIn profile URL: acct-4821",
+    "tiktok": "- TikTok username: acct-4821",
+    "opay": None,
+    "jumia": None,
+    "konga": "- KongaPay username / customer ID: acct-4821",
+    "piggyvest": "- PiggyVest username: acct-4821",
+    "palmpay": None,
+    "pinterest": "- Pinterest username: acct-4821",
+}
+
+
+def _details(platform, **overrides):
+    fields = dict(full_name="Ada Obi", email="ada@example.org", phone="+2348000000000",
+                  country="Nigeria", accounts={platform: ACCOUNT})
+    fields.update(overrides)
+    return RequesterDetails(**fields)
+
+
+def test_every_template_is_covered():
+    assert set(ACCOUNT_LINES) == set(platform_templates)
+
+
+@pytest.mark.parametrize("platform", sorted(platform_templates))
+def test_render_letter(platform):
+    template = platform_templates[platform]
+    letter = render_letter(platform, template, _details(platform))
+    lines = letter.body.splitlines()
+
+    assert letter.recipient == template["email"]
+    assert letter.subject == template["subject"]
+    assert "[" not in letter.body
+    assert "- Full name: Ada Obi" in lines
+    assert any(l.endswith("Nigeria") for l in lines)
+    assert lines[-3:] == ["Ada Obi", "ada@example.org", "+2348000000000"]
+
+    expected = ACCOUNT_LINES[platform]
+    if expected is None:
+        assert ACCOUNT not in letter.body
+    else:
+        assert [l for l in lines if ACCOUNT in l] == [expected]
+
+
+def test_lines_without_a_value_are_dropped():
+    spotify = render_letter("spotify", platform_templates["spotify"], _details("spotify")).body
+    assert "Subscriber ID" not in spotify
+
+    jumia = render_letter("jumia", platform_templates["jumia"], _details("jumia")).body
+    assert "order IDs" not in jumia
+
+    github = render_letter("github", platform_templates["github"], _details("github", accounts={}, phone="")).body
+    assert "GitHub username" not in github
+    assert github.splitlines()[-2:] == ["Ada Obi", "ada@example.org"]
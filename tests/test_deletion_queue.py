@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from deletion.dispatch import Dispatcher, DomainThrottle, SMTPPool, dispatcher_from_env
+from deletion.letters import Letter
+from deletion.queue import DispatchQueue
+
+
+def _letter(n, recipient="dpo@example.com"):
+    return Letter(platform=f"platform{n}", recipient=recipient, subject="Request", body="Please erase my data.")
+
+
+def _confirmation(recipient="user@example.org"):
+    return Letter(platform="confirmation", recipient=recipient, subject="Confirm", body="Confirm.")
+
+
+def test_letters_wait_for_confirmation(tmp_path):
+    q = DispatchQueue(str(tmp_path / "q.db"))
+    request_id = q.enqueue([_letter(1), _letter(2)], "user@example.org", "tok", _confirmation())
+
+    assert q.claim("example.com", 10) == []
+    assert len(q.claim("example.org", 10)) == 1  # the confirmation email itself
+
+    assert q.confirm("wrong") is None
+    assert q.confirm("tok") == request_id
+    assert q.confirm("tok") is None
+    assert len(q.claim("example.com", 10)) == 2
+
+
+def test_expired_confirmation_does_not_release_letters(tmp_path):
+    q = DispatchQueue(str(tmp_path / "q.db"))
+    q.enqueue([_letter(1)], "user@example.org", "tok", _confirmation(), ttl=-1)
+
+    assert q.confirm("tok") is None
+    assert q.claim("example.com", 10) == []
+
+
+def test_other_workers_only_take_over_expired_leases(tmp_path):
+    path = str(tmp_path / "q.db")
+    first = DispatchQueue(path, lease_seconds=0.2)
+    first.enqueue([_letter(1)], "user@example.org", "tok", _confirmation())
+    first.confirm("tok")
+    claimed = first.claim("example.com", 10)
+
+    second = DispatchQueue(path, lease_seconds=0.2)
+    assert second.claim("example.com", 10) == []
+
+    time.sleep(0.3)
+    taken = second.claim("example.com", 10)
+    assert [j["id"] for j in taken] == [j["id"] for j in claimed]
+
+    # The stale owner can no longer change the job.
+    first.mark_sent([j["id"] for j in claimed])
+    assert second.status(taken[0]["request_id"])["jobs"][1]["status"] == "sending"
+
+
+def test_unbuildable_message_fails_without_blocking_batch(tmp_path):
+    q = DispatchQueue(str(tmp_path / "q.db"))
+    request_id = q.enqueue([_letter(1)], "bad\r\nBcc: x@example.net", "tok", _confirmation())
+    q.confirm("tok")
+    # Never connects: every message in the batch fails to build first.
+    pool = SMTPPool("127.0.0.1", 9, starttls=False)
+    pool._checkout = lambda: None
+    dispatcher = Dispatcher(q, pool, "noreply@example.net", DomainThrottle(100, 100))
+
+    while dispatcher.run_once():
+        pass
+
+    assert q.status(request_id)["counts"] == {"failed": 2}
+
+
+def test_dispatch_requires_public_url(tmp_path, monkeypatch):
+    monkeypatch.setenv("SMTP_HOST", "smtp.example.com")
+    monkeypatch.setenv("SMTP_FROM", "noreply@example.com")
+    monkeypatch.setenv("DISPATCH_DB", str(tmp_path / "q.db"))
+    monkeypatch.delenv("PUBLIC_API_URL", raising=False)
+    with pytest.raises(RuntimeError, match="PUBLIC_API_URL"):
+        dispatcher_from_env()
+
+
+def test_no_queue_without_smtp(tmp_path, monkeypatch):
+    monkeypatch.delenv("SMTP_HOST", raising=False)
+    monkeypatch.setenv("DISPATCH_DB", str(tmp_path / "q.db"))
+    assert dispatcher_from_env() is None
+    assert not (tmp_path / "q.db").exists()
+
+
+def test_failed_transaction_does_not_wedge_the_queue(tmp_path):
+    q = DispatchQueue(str(tmp_path / "q.db"))
+    q.enqueue([_letter(1)], "user@example.org", "tok", _confirmation())
+    with pytest.raises(Exception):
+        # Same token hash twice violates the UNIQUE constraint mid-transaction.
+        q.enqueue([_letter(2)], "user@example.org", "tok", _confirmation())
+
+    request_id = q.enqueue([_letter(3)], "user@example.org", "other", _confirmation())
+    assert q.confirm("other") == request_id
+    assert [j["platform"] for j in q.claim("example.com", 10)] == ["platform3"]
+
+
+def test_unconfirmed_letters_expire(tmp_path):
+    q = DispatchQueue(str(tmp_path / "q.db"))
+    stale = q.enqueue([_letter(1), _letter(2)], "user@example.org", "old", _confirmation(), ttl=-1)
+    live = q.enqueue([_letter(3)], "user@example.org", "new", _confirmation())
+
+    assert q.expire_unconfirmed() == 2
+    assert q.expire_unconfirmed() == 0
+    assert q.status(stale)["counts"] == {"queued": 1, "expired": 2}
+    assert q.status(live)["counts"] == {"queued": 1, "awaiting_confirmation": 1}
+    assert q.confirm("old") is None
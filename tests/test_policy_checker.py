@@ -0,0 +1,116 @@
+import pytest
+
+from ndpa import checker
+from ndpa.checker import _PolicyTextParser, fetch_policy
+
+
+class FakeResponse:
+    def __init__(self, body=b"", status=200, headers=None, encoding="utf-8"):
+        self.body = body
+        self.status_code = status
+        self.headers = {"Content-Type": "text/html; charset=utf-8", **(headers or {})}
+        self.encoding = encoding
+        self.is_redirect = False
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """
+    Routes fetch_policy to a canned response and records the request headers.
+    """
+    sent = []
+
+    def install(response):
+        def fake_get(url, headers=None, **kwargs):
+            sent.append(headers or {})
+            return response
+        monkeypatch.setattr(checker, "check_public_url", lambda url: None)
+        monkeypatch.setattr(checker.requests, "get", fake_get)
+        return sent
+
+    return install
+
+
+def _parse(*chunks, max_chars=1000):
+    parser = _PolicyTextParser(max_chars)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser.text()
+
+
+def test_parser_keeps_words_split_across_chunks():
+    assert _parse("<p>Priv", "acy policy</p>") == "Privacy policy"
+    assert _parse("<p>We collect", " data</p>") == "We collect data"
+    assert _parse("<p>one</p><p>", "two</p>") == "one two"
+
+
+def test_parser_drops_skipped_subtrees():
+    html = ("<nav>Home <b>Menu</b></nav><p>Kept</p><script>var x = 1;</script>"
+            "<footer><div>Copyright</div></footer><p>text</p>")
+    assert _parse(html) == "Kept text"
+
+
+def test_parser_stops_at_max_chars():
+    parser = _PolicyTextParser(10)
+    parser.feed("<p>abcdefgh ijklmnop</p>")
+    assert parser.full
+    assert parser.text() == "abcdefgh i"
+    parser.feed("<p>more</p>")
+    assert parser.text() == "abcdefgh i"
+
+
+def test_fetch_extracts_text_in_chunks(serve):
+    body = b"<html><body><p>" + b"word " * 20000 + b"</p></body></html>"
+    serve(FakeResponse(body, headers={"ETag": '"v1"'}))
+    fetched = fetch_policy("https://example.com/privacy")
+    assert fetched["status"] == 200
+    assert fetched["etag"] == '"v1"'
+    assert fetched["text"].split() == ["word"] * 20000
+
+
+def test_fetch_enforces_byte_cap(serve):
+    serve(FakeResponse(b"<p>" + b"x" * 5000 + b"</p>"))
+    with pytest.raises(RuntimeError, match="exceeds limit"):
+        fetch_policy("https://example.com/privacy", max_bytes=1000)
+
+    serve(FakeResponse(b"<p>small</p>", headers={"Content-Length": "999999"}))
+    with pytest.raises(RuntimeError, match="limit is 1000"):
+        fetch_policy("https://example.com/privacy", max_bytes=1000)
+
+
+def test_fetch_rejects_unsupported_content_type(serve):
+    serve(FakeResponse(b"%PDF-1.7", headers={"Content-Type": "application/pdf"}))
+    with pytest.raises(RuntimeError, match="unsupported content type 'application/pdf'"):
+        fetch_policy("https://example.com/privacy.pdf")
+
+
+def test_fetch_not_modified_returns_no_text(serve):
+    sent = serve(FakeResponse(status=304, headers={"ETag": '"v1"'}))
+    fetched = fetch_policy("https://example.com/privacy", etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    assert fetched["status"] == 304
+    assert fetched["text"] is None
+    assert sent[0]["If-None-Match"] == '"v1"'
+    assert sent[0]["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+def test_fetch_falls_back_to_utf8_for_unknown_charset(serve):
+    serve(FakeResponse("<p>Política</p>".encode("utf-8"), encoding="utf8mb4"))
+    assert fetch_policy("https://example.com/privacy")["text"] == "Política"
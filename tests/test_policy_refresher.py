@@ -0,0 +1,107 @@
+import pytest
+
+from ndpa import refresher
+from ndpa.refresher import PolicyCache, PolicyRefresher, analyze_policy_cached, estimate_tokens
+
+URL = "https://example.com/privacy"
+
+
+class FakeSite:
+    """
+    Stands in for fetch_policy and analyze_policy_text, counting calls.
+    """
+
+    def __init__(self, pages):
+        self.pages = dict(pages)
+        self.fetches = []
+        self.analyzed = []
+
+    def fetch(self, url, etag=None, last_modified=None, **kwargs):
+        self.fetches.append((url, etag))
+        text = self.pages[url]
+        if isinstance(text, Exception):
+            raise text
+        version = f'"{hash(text)}"'
+        return {"status": 304 if etag == version else 200,
+                "text": None if etag == version else text, "etag": version, "last_modified": None}
+
+    def analyze(self, text):
+        self.analyzed.append(text)
+        return {"explanation": text}
+
+
+@pytest.fixture
+def site(monkeypatch):
+    fake = FakeSite({URL: "policy v1", "https://example.org/privacy": "other policy"})
+    monkeypatch.setattr(refresher, "fetch_policy", fake.fetch)
+    monkeypatch.setattr(refresher, "analyze_policy_text", fake.analyze)
+    return fake
+
+
+def test_cached_hit_skips_fetch_and_analysis(site):
+    cache = PolicyCache(ttl=3600)
+    assert analyze_policy_cached(URL, cache) == {"explanation": "policy v1"}
+    assert analyze_policy_cached(URL, cache) == {"explanation": "policy v1"}
+    assert len(site.fetches) == 1
+    assert site.analyzed == ["policy v1"]
+
+
+def test_stale_entry_with_unchanged_text_is_not_reanalyzed(site):
+    cache = PolicyCache(ttl=0)
+    analyze_policy_cached(URL, cache)
+    analyze_policy_cached(URL, cache)
+    assert len(site.fetches) == 2
+    assert site.fetches[1][1] is not None  # conditional re-fetch
+    assert site.analyzed == ["policy v1"]
+
+
+def test_failed_refetch_serves_cached_result(site):
+    cache = PolicyCache(ttl=0)
+    analyze_policy_cached(URL, cache)
+    site.pages[URL] = RuntimeError("Error scraping URL: timed out")
+    assert analyze_policy_cached(URL, cache) == {"explanation": "policy v1"}
+
+
+def test_request_counts_stay_bounded(site):
+    cache = PolicyCache(max_entries=10)
+    for n in range(100):
+        analyze_policy_cached(f"pasted policy {n}", cache)
+    for n in range(30):
+        url = f"https://example.com/{n}"
+        site.pages[url] = f"policy {n}"
+        analyze_policy_cached(url, cache)
+    assert len(cache._entries) == 10
+    assert len(cache._hits) <= 10
+    assert all(k.startswith("https://") for k in cache._hits)
+
+
+def test_refresh_cycle_reanalyzes_only_changed_sources(site):
+    cache = PolicyCache()
+    analyze_policy_cached(URL, cache)
+    analyze_policy_cached("https://example.org/privacy", cache)
+    site.pages[URL] = "policy v2"
+
+    stats = PolicyRefresher(cache, concurrency=1).run_cycle()
+    assert stats["sources"] == 2
+    assert stats["unchanged"] == 1
+    assert stats["changed"] == stats["analyzed"] == 1
+    assert site.analyzed[-1] == "policy v2"
+    assert cache.get(URL)["result"] == {"explanation": "policy v2"}
+
+
+def test_refresh_cycle_defers_past_token_budget(site):
+    cache = PolicyCache()
+    other = "https://example.org/privacy"
+    analyze_policy_cached(other, cache)
+    for _ in range(3):
+        analyze_policy_cached(URL, cache)  # more popular, so refreshed first
+    site.pages[URL] = "policy v2"
+    site.pages[other] = "other policy v2"
+
+    budget = estimate_tokens("policy v2")
+    stats = PolicyRefresher(cache, concurrency=1, token_budget=budget).run_cycle()
+    assert stats["changed"] == 2
+    assert stats["analyzed"] == stats["deferred"] == 1
+    assert stats["tokens"] == budget
+    assert cache.get(URL)["result"] == {"explanation": "policy v2"}
+    assert cache.get(other)["result"] == {"explanation": "other policy"}